@@ -82,9 +82,11 @@ def translate_text(message_id, model_name, api_key, prompt=""):
         logger.error(f"API key present: {'Yes' if api_key else 'No'}")
         logger.error(f"Prompt length: {len(prompt) if prompt else 0}")
         
-        # Add stack trace for debugging
-        import traceback
-        logger.error(f"Stack trace: {traceback.format_exc()}")
+        # Add stack trace for debugging - formatting the traceback allocates
+        # kilobytes of strings, so only pay for it when DEBUG is enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            import traceback
+            logger.debug(f"Stack trace: {traceback.format_exc()}")
         
         # Return a failed status instead of re-raising the exception
         # This ensures the error is properly handled and marked as failed
@@ -17,9 +17,14 @@ Performance improvements:
 
 import asyncio
 import concurrent.futures
+import functools
+import hashlib
+import json
 import logging
 import os
+import random
 import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional, Callable, Tuple
 from concurrent.futures import ThreadPoolExecutor
 import sys
@@ -29,12 +34,50 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.translator import translate_with_openai, translate_with_claude, translate_with_gemini
 
+# Optional dependency: exact tokenization for OpenAI models. Without it we
+# fall back to a chars-per-token approximation.
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Optional dependency: orjson encodes UTF-8 strings several times faster
+# than stdlib json and skips the intermediate str allocation - real CPU on
+# multi-MB Tibetan corpora serialized into dozens of prompts
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _json_dumps(obj) -> str:
+    """Serialize to a JSON string (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, ensure_ascii=False)
+
+def _json_loads(text: str):
+    """Parse a JSON string (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Performance Configuration
 MAX_PARALLEL_BATCHES = int(os.getenv("MAX_PARALLEL_BATCHES", "20"))  # Increased from 4
+# Concurrency cap for the native-async path. This is a count of in-flight
+# HTTP requests on one event loop, not OS threads, so it can be sized
+# against provider RPM limits (typically 500-5000/min) rather than memory
+MAX_INFLIGHT_REQUESTS = int(os.getenv("MAX_INFLIGHT_REQUESTS", "200"))
 MAX_BATCH_CHARS = int(os.getenv("MAX_BATCH_CHARS", "8000"))
+# Model throughput is token-bound, not char-bound - Tibetan/Unicode text
+# can be ~3x denser in tokens than ASCII, so batches are packed against a
+# token budget rather than raw characters
+MAX_BATCH_TOKENS = int(os.getenv("MAX_BATCH_TOKENS", "3000"))
+# Floor for batch-then-shard subdivision: never split a batch below this
+# many segments, the per-call overhead would outweigh the parallelism
+SHARD_MIN_SEGMENTS = int(os.getenv("SHARD_MIN_SEGMENTS", "5"))
 RECOMMENDED_CONTENT_LENGTH = int(os.getenv("RECOMMENDED_CONTENT_LENGTH", "50000"))
 LARGE_TEXT_WARNING_THRESHOLD = int(os.getenv("LARGE_TEXT_WARNING_THRESHOLD", "100000"))
 
@@ -42,6 +85,22 @@ LARGE_TEXT_WARNING_THRESHOLD = int(os.getenv("LARGE_TEXT_WARNING_THRESHOLD", "10
 SMALL_TEXT_BATCH_SIZE = int(os.getenv("SMALL_TEXT_BATCH_SIZE", "15"))  # Increased
 LARGE_TEXT_BATCH_SIZE = int(os.getenv("LARGE_TEXT_BATCH_SIZE", "25"))  # Increased
 
+# How often the progress flusher drains queued status updates. Each batch
+# completion used to await two Redis round-trips inline; coalescing them
+# into one flush per window keeps progress traffic off the hot path.
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "0.25"))
+
+# Feed partial translations to update_partial_result_func at newline
+# boundaries while tokens stream in. Off by default because the Redis
+# partial-result summary counts each call as a completed batch.
+STREAM_PARTIAL_RESULTS = os.getenv("STREAM_PARTIAL_RESULTS", "0") == "1"
+
+# OpenAI Batch API settings (opt-in path for huge offline jobs)
+USE_BATCH_API = os.getenv("USE_BATCH_API", "0") == "1"
+BATCH_API_POLL_INITIAL_SECONDS = float(os.getenv("BATCH_API_POLL_INITIAL_SECONDS", "5"))
+BATCH_API_POLL_MAX_SECONDS = float(os.getenv("BATCH_API_POLL_MAX_SECONDS", "60"))
+BATCH_API_TIMEOUT_SECONDS = float(os.getenv("BATCH_API_TIMEOUT_SECONDS", "3600"))
+
 # Translation prompt template
 SYSTEM_PROMPT = """You are a professional translator. Translate the provided text accurately while maintaining:
 1. Original formatting and structure
@@ -52,81 +111,380 @@ SYSTEM_PROMPT = """You are a professional translator. Translate the provided tex
 def get_optimal_config(content_length: int) -> Tuple[int, int]:
     """
     Get optimal batch size and worker count based on content length.
-    
+
+    "Workers" here means concurrently in-flight requests, not OS threads;
+    the effective count is always capped at the batch count downstream.
+
     Returns:
         Tuple[batch_size, max_workers]
     """
     if content_length < 10000:
         # Small text: fewer, larger batches with high parallelism
-        return SMALL_TEXT_BATCH_SIZE, MAX_PARALLEL_BATCHES
+        return SMALL_TEXT_BATCH_SIZE, MAX_INFLIGHT_REQUESTS
     elif content_length < 50000:
         # Medium text: balanced approach
-        return 20, MAX_PARALLEL_BATCHES
+        return 20, MAX_INFLIGHT_REQUESTS
     else:
         # Large text: many smaller batches with maximum parallelism
-        return LARGE_TEXT_BATCH_SIZE, MAX_PARALLEL_BATCHES
+        return LARGE_TEXT_BATCH_SIZE, MAX_INFLIGHT_REQUESTS
+
+@functools.lru_cache(maxsize=8)
+def _token_encoder(model_name: str):
+    """Get the tiktoken encoder for an OpenAI model, or None"""
+    if tiktoken is None or not (model_name.startswith("gpt") or model_name.startswith("text-davinci")):
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+# Cached per segment string so duplicated segments (refrains, boilerplate)
+# are only tokenized once
+@functools.lru_cache(maxsize=16384)
+def _count_tokens(segment: str, model_name: str) -> int:
+    """
+    Count (or estimate) the input tokens for one segment.
+
+    OpenAI models get exact counts via tiktoken when it's installed;
+    Claude/Gemini and tiktoken-less installs use a ~3-chars-per-token
+    approximation, which is conservative for dense Unicode like Tibetan.
+    """
+    enc = _token_encoder(model_name)
+    if enc is not None:
+        return len(enc.encode(segment))
+    return max(1, len(segment) // 3)
+
+def _build_batches(segments: List[str], batch_size: int, model_name: str = "") -> List[List[str]]:
+    """
+    Group segments into batches bounded by segment count and a token budget.
+
+    Packing against MAX_BATCH_TOKENS instead of raw characters maximizes
+    batch fill-rate (fewer API calls) without blowing the model's context.
+    Batches stay as segment lists all the way to prompt construction - the
+    old newline join here forced every consumer to split the string right
+    back apart, a pure copy tax on large documents.
+
+    Returns:
+        List of segment-list batches ready for translation
+    """
+    batched_segments = []
+    current_batch = []
+    current_tokens = 0
+
+    for segment in segments:
+        segment_tokens = _count_tokens(segment, model_name)
+
+        # If adding this segment exceeds the token budget, start new batch
+        if current_tokens + segment_tokens > MAX_BATCH_TOKENS and current_batch:
+            batched_segments.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+
+        current_batch.append(segment)
+        current_tokens += segment_tokens
+
+        # If batch reaches size limit, start new batch
+        if len(current_batch) >= batch_size:
+            batched_segments.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+
+    # Add final batch if not empty
+    if current_batch:
+        batched_segments.append(current_batch)
+
+    return batched_segments
+
+# Content-addressed translation cache: documents with repeated refrains,
+# chants or boilerplate contain many identical segments, and long-running
+# workers see the same segments across jobs. Keyed by a digest of
+# model|target_lang|segment so a hit is only ever reused for the exact same
+# request shape. Bounded LRU so worker memory stays flat.
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "100000"))
+_translation_cache: "OrderedDict[bytes, str]" = OrderedDict()
+
+def _cache_key(model_name: str, target_lang: Optional[str], segment: str) -> bytes:
+    """Build the cache key digest for one segment"""
+    return hashlib.blake2b(
+        f"{model_name}|{target_lang}|{segment}".encode(), digest_size=16
+    ).digest()
+
+def _cache_get(key: bytes) -> Optional[str]:
+    """Look up a cached translation, refreshing its LRU position on a hit"""
+    hit = _translation_cache.get(key)
+    if hit is not None:
+        _translation_cache.move_to_end(key)
+    return hit
+
+def _cache_put(key: bytes, translation: str) -> None:
+    """Store a translation, evicting the least recently used entries if full"""
+    _translation_cache[key] = translation
+    _translation_cache.move_to_end(key)
+    while len(_translation_cache) > TRANSLATION_CACHE_SIZE:
+        _translation_cache.popitem(last=False)
+
+def _extract_translations(content_text: str) -> str:
+    """
+    Extract newline-joined translations from a raw model response.
+
+    Models are prompted to return {"translation": [...]} JSON; parse that when
+    present, otherwise fall back to treating the response as plain lines.
+    """
+    text = content_text.strip()
+    if '{' in text and '}' in text:
+        try:
+            parsed = _json_loads(text[text.find('{'):text.rfind('}') + 1])
+            translations = parsed.get('translation')
+            if isinstance(translations, list) and translations:
+                return "\n".join(str(t) for t in translations)
+        except ValueError:
+            pass
+    return text
+
+# Client construction costs a TLS handshake and connection setup per call;
+# cache one client per API key, and hand every SDK the shared pooled httpx
+# transport so concurrent batches reuse warm connections across providers.
+# Caching is per event loop (see _loop_client) - the Celery workers run a
+# fresh loop per job, and a client from a closed loop is unusable.
+def _openai_async_client(api_key: str):
+    from utils.translator import _loop_client, _shared_http_client
+
+    def build():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, http_client=_shared_http_client())
+
+    return _loop_client(("openai", api_key), build)
+
+def _anthropic_async_client(api_key: str):
+    from utils.translator import _loop_client, _shared_http_client
+
+    def build():
+        from anthropic import AsyncAnthropic
+        return AsyncAnthropic(api_key=api_key, http_client=_shared_http_client())
+
+    return _loop_client(("anthropic", api_key), build)
+
+@functools.lru_cache(maxsize=32)
+def _gemini_client(model_name: str, api_key: str):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model_name, temperature=0, google_api_key=api_key)
+
+async def translate_with_openai_native(
+    content: str, model_name: str, api_key: str,
+    on_delta: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """
+    Translate using OpenAI's native async client (no worker thread).
+
+    Streams the response so the first tokens are usable in ~100ms instead
+    of waiting for the whole completion; each text delta is forwarded to
+    on_delta when provided.
+    """
+    client = _openai_async_client(api_key)
+    # Keep the static instructions as a stable system-first prefix - OpenAI
+    # auto-caches identical prompt prefixes, so the shared SYSTEM_PROMPT is
+    # processed once per cache window instead of per batch
+    system_text = "You are a professional translator. Translate the provided text accurately."
+    if content.startswith(SYSTEM_PROMPT):
+        content = content[len(SYSTEM_PROMPT):].lstrip("\n")
+        system_text = SYSTEM_PROMPT
+    stream = await client.chat.completions.create(
+        model=model_name,
+        messages=[
+            {"role": "system", "content": system_text},
+            {"role": "user", "content": content}
+        ],
+        temperature=0.3,
+        max_tokens=4000,
+        stream=True
+    )
+    parts = []
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            if on_delta:
+                await on_delta(delta)
+    return {"translated_text": "".join(parts)}
+
+async def translate_with_claude_native(
+    content: str, model_name: str, api_key: str,
+    on_delta: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """Translate using Anthropic's native async client, streaming text deltas"""
+    client = _anthropic_async_client(api_key)
+    # Lift the shared system prompt into a cache_control block so Anthropic
+    # processes and bills the static prefix once per ~5 min cache window
+    # rather than on every batch
+    stream_kwargs = dict(
+        model=model_name,
+        max_tokens=4000,
+        temperature=0,
+        messages=[{"role": "user", "content": content}]
+    )
+    if content.startswith(SYSTEM_PROMPT):
+        stream_kwargs["messages"] = [{"role": "user", "content": content[len(SYSTEM_PROMPT):].lstrip("\n")}]
+        stream_kwargs["system"] = [{
+            "type": "text",
+            "text": SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"}
+        }]
+    parts = []
+    async with client.messages.stream(**stream_kwargs) as stream:
+        async for delta in stream.text_stream:
+            parts.append(delta)
+            if on_delta:
+                await on_delta(delta)
+    return {"translated_text": _extract_translations("".join(parts))}
+
+async def translate_with_gemini_native(
+    content: str, model_name: str, api_key: str,
+    on_delta: Optional[Callable] = None
+) -> Dict[str, Any]:
+    """Translate using Gemini via langchain's async streaming (no worker thread)"""
+    llm = _gemini_client(model_name, api_key)
+    parts = []
+    async for chunk in llm.astream(content):
+        delta = chunk.content if hasattr(chunk, 'content') else str(chunk)
+        if delta:
+            parts.append(delta)
+            if on_delta:
+                await on_delta(delta)
+    return {"translated_text": _extract_translations("".join(parts))}
+
+class ProviderLimiter:
+    """
+    Shared rate-limit gate for one (provider, API key) pair.
+
+    When a provider returns 429, every in-flight batch on the same key used
+    to sleep its own fixed exponential backoff, so all workers retried in
+    lockstep and ignored the Retry-After the provider actually asked for.
+    This limiter records the reset time from the latest 429 and gates every
+    retry behind it, with jitter so waiters don't wake simultaneously.
+    """
+
+    def __init__(self):
+        self._reset_at = 0.0
+
+    @staticmethod
+    def _retry_after_seconds(error) -> Optional[float]:
+        """Pull a retry delay from the error's HTTP response headers, if any"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        for header in ("retry-after", "x-ratelimit-reset-requests"):
+            value = headers.get(header)
+            if value:
+                try:
+                    # Providers send plain seconds ("2") or suffixed ("2s")
+                    return float(str(value).rstrip("s"))
+                except ValueError:
+                    continue
+        return None
+
+    async def wait_then_retry(self, error, retry_count: int) -> None:
+        """
+        Sleep until the provider's rate-limit window resets.
+
+        Falls back to full-jitter backoff when the error carries no
+        Retry-After information (network errors, 5xx, plain strings).
+        """
+        retry_after = self._retry_after_seconds(error)
+        now = time.monotonic()
+        if retry_after is not None:
+            # Extend the shared reset point; concurrent retries on the same
+            # key all wait for it instead of hammering the endpoint
+            self._reset_at = max(self._reset_at, now + retry_after)
+        wait_time = self._reset_at - now
+        if wait_time > 0:
+            # Respect the provider's window, spread wake-ups with jitter
+            wait_time += random.uniform(0, 1)
+        else:
+            # Full jitter over the capped exponential window: identical
+            # deterministic delays would make every concurrent batch retry
+            # at the same wall-clock instant and trigger a second storm
+            wait_time = random.uniform(0, min(2 ** retry_count, 30))
+        await asyncio.sleep(wait_time)
+
+# Auth failures trip the per-job circuit breaker after this many strikes;
+# a bad key fails every batch identically, so retry/backoff is pure waste
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "3"))
+
+def _is_auth_error(error) -> bool:
+    """True for invalid-key/permission errors that no retry can fix"""
+    if getattr(error, "status_code", None) in (401, 403):
+        return True
+    return type(error).__name__ in ("AuthenticationError", "PermissionDeniedError")
+
+# One limiter per (provider function, API key) so unrelated keys never
+# block each other
+_provider_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+
+def _get_limiter(translate_func: Callable, api_key: str) -> ProviderLimiter:
+    """Get (or create) the shared limiter for this provider/key pair"""
+    key = (getattr(translate_func, '__name__', 'unknown'), api_key)
+    limiter = _provider_limiters.get(key)
+    if limiter is None:
+        limiter = _provider_limiters.setdefault(key, ProviderLimiter())
+    return limiter
+
+# Map the sync translation functions to their native async replacements -
+# awaiting these directly keeps the whole fan-out on one event loop instead
+# of burning an OS thread per in-flight request
+_NATIVE_ASYNC_FUNCS = {
+    'translate_with_openai': translate_with_openai_native,
+    'translate_with_claude': translate_with_claude_native,
+    'translate_with_gemini': translate_with_gemini_native,
+}
 
 async def translate_text_async(
     translate_func: Callable,
     message_id: str,
-    model_name: str, 
+    model_name: str,
     api_key: str,
     prompt: str,
-    executor: ThreadPoolExecutor
+    executor: Optional[ThreadPoolExecutor] = None,
+    on_delta: Optional[Callable] = None
 ) -> Dict[str, Any]:
     """
-    Async wrapper for synchronous translation functions using ThreadPoolExecutor.
-    
+    Async translation dispatch.
+
+    Known provider functions are routed to their native async clients and
+    awaited directly; unknown translation functions fall back to running in
+    a thread so custom callables keep working.
+
     Args:
         translate_func: Translation function (translate_with_openai, etc.)
         message_id: Unique identifier for the translation job
         model_name: Model to use for translation
         api_key: API key for the translation service
         prompt: Text prompt to translate
-        executor: ThreadPoolExecutor for running sync code in thread
-        
+        executor: Optional ThreadPoolExecutor for the sync fallback path
+        on_delta: Optional async callback fed streamed text deltas (native
+            provider paths only - the sync fallback can't stream)
+
     Returns:
         Dict with translation result
     """
-    loop = asyncio.get_event_loop()
-    
     try:
-        # Run the synchronous translation function in a thread
-        if translate_func.__name__ == 'translate_with_openai':
-            result = await loop.run_in_executor(
-                executor, 
-                translate_func,
-                prompt,  # content parameter
-                model_name,
-                api_key
-            )
-        elif translate_func.__name__ == 'translate_with_claude':
-            result = await loop.run_in_executor(
-                executor,
-                translate_func, 
-                prompt,  # content parameter
-                model_name,
-                api_key
-            )
-        elif translate_func.__name__ == 'translate_with_gemini':
-            result = await loop.run_in_executor(
-                executor,
-                translate_func,
-                prompt,  # content parameter  
-                model_name,
-                api_key
-            )
+        native_func = _NATIVE_ASYNC_FUNCS.get(getattr(translate_func, '__name__', None))
+        if native_func is not None:
+            result = await native_func(prompt, model_name, api_key, on_delta=on_delta)
         else:
-            # Fallback for unknown translation functions
+            # Fallback for unknown (sync) translation functions.
+            # get_running_loop: we are inside a coroutine, so a loop is
+            # guaranteed - no deprecated get_event_loop fallback machinery
+            loop = asyncio.get_running_loop()
             result = await loop.run_in_executor(
                 executor,
                 translate_func,
                 message_id,
-                model_name, 
+                model_name,
                 api_key,
                 prompt
             )
-        
+
         # Normalize the result format
         if isinstance(result, dict):
             if "translated_text" in result:
@@ -153,12 +511,65 @@ async def translate_text_async(
         return {
             "status": "failed",
             "error": str(e),
+            # Keep the exception itself so the retry path can inspect
+            # rate-limit headers (never serialized, internal use only)
+            "exception": e,
             "message_id": message_id
         }
 
+async def _drain_progress_queue(
+    queue: asyncio.Queue,
+    update_status_func: Optional[Callable],
+    update_partial_result_func: Optional[Callable]
+) -> None:
+    """
+    Drain all queued progress updates and forward them coalesced.
+
+    Only the highest-progress status update survives a window (earlier
+    ones are stale by the time they'd be written); partial results keep
+    the latest text per batch index.
+    """
+    best_status = None
+    partials = {}
+    while not queue.empty():
+        kind, payload = queue.get_nowait()
+        if kind == "status":
+            if best_status is None or payload["progress"] >= best_status["progress"]:
+                best_status = payload
+        else:
+            partials[payload["batch_index"]] = payload
+    # Progress writes are best-effort: one transient Redis hiccup must not
+    # kill the flusher task (and with it the job whose translation work is
+    # actually succeeding), so each update fails soft with a warning
+    if best_status is not None and update_status_func:
+        try:
+            await update_status_func(**best_status)
+        except Exception as e:
+            logger.warning(f"Status update failed (progress {best_status.get('progress')}): {e}")
+    if update_partial_result_func:
+        for payload in partials.values():
+            try:
+                await update_partial_result_func(**payload)
+            except Exception as e:
+                logger.warning(f"Partial-result update failed (batch {payload.get('batch_index')}): {e}")
+
+async def _progress_flusher(
+    queue: asyncio.Queue,
+    update_status_func: Optional[Callable],
+    update_partial_result_func: Optional[Callable]
+) -> None:
+    """Background task: flush queued progress updates every flush window"""
+    try:
+        while True:
+            await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+            await _drain_progress_queue(queue, update_status_func, update_partial_result_func)
+    except asyncio.CancelledError:
+        # Final flush so the last updates before shutdown aren't dropped
+        await _drain_progress_queue(queue, update_status_func, update_partial_result_func)
+
 async def translate_batch_parallel(
     batch_index: int,
-    batch: str,
+    batch: List[str],
     translate_func: Callable,
     message_id: str,
     model_name: str,
@@ -167,15 +578,18 @@ async def translate_batch_parallel(
     target_lang: Optional[str] = None,
     update_status_func: Optional[Callable] = None,
     total_batches: int = 1,
-    executor: ThreadPoolExecutor = None,
-    update_partial_result_func: Optional[Callable] = None
+    executor: Optional[ThreadPoolExecutor] = None,
+    update_partial_result_func: Optional[Callable] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    status_queue: Optional[asyncio.Queue] = None,
+    breaker: Optional[Dict[str, Any]] = None
 ) -> Tuple[int, str]:
     """
     Translate a single batch using parallel async processing.
     
     Args:
         batch_index: Index of the batch (for ordering)
-        batch: Text batch to translate
+        batch: List of segments to translate
         translate_func: Translation function to use
         message_id: Unique identifier for the translation job
         model_name: Model to use for translation
@@ -184,92 +598,331 @@ async def translate_batch_parallel(
         target_lang: Target language code  
         update_status_func: Function to update translation status
         total_batches: Total number of batches
-        executor: ThreadPoolExecutor for parallel execution
+        executor: Optional ThreadPoolExecutor for the sync fallback path
         update_partial_result_func: Function to update partial results
-        
+        semaphore: Shared asyncio.Semaphore capping in-flight requests
+        status_queue: Queue for coalesced progress updates; when set, the
+            per-batch awaits become non-blocking enqueues
+        breaker: Shared per-job circuit-breaker state; once tripped by
+            repeated auth failures, remaining batches abort immediately
+
     Returns:
         Tuple[batch_index, translated_text]
     """
     start_time = time.time()
     max_retries = 3
-    
-    for retry_count in range(max_retries + 1):
-        try:
-            if retry_count > 0:
-                logger.info(f"[{message_id}] Retry {retry_count+1}/{max_retries} for batch {batch_index+1}/{total_batches}")
-            
-            # Prepare translation prompt
-            source = batch.split('\n')
-            length = len(source)
-            prompt = (
-                f"{SYSTEM_PROMPT}\n"
-                f"[Translate the text to {target_lang} which is code for a language. "
-                f"the translations should be in an array of strings with the same length as the source text. "
-                f"that is {length} translations]\n"
-                f"{source}"
-            )
-            
-            # Call async translation function
-            result = await translate_text_async(
-                translate_func,
-                message_id,
-                model_name,
-                api_key, 
-                prompt,
-                executor
-            )
-            
-            # Extract translated text
-            if result.get("status") == "completed":
-                translated_text = result["translated_text"].replace('</br>', '\n')
-                
-                # Calculate processing time
-                processing_time = time.time() - start_time
-                logger.info(f"[{message_id}] ✅ Batch {batch_index+1}/{total_batches} completed in {processing_time:.2f}s")
-                
-                # Update progress immediately after successful batch
-                if update_status_func:
-                    progress = max(10, int(((batch_index + 1) / total_batches) * 85) + 10)  # 10-95% range
-                    await update_status_func(
-                        message_id=message_id,
-                        progress=progress,
-                        status_type="started",
-                        message=f"Completed batch {batch_index+1}/{total_batches} ({processing_time:.1f}s)"
-                    )
-                
-                # Store partial result for real-time updates
-                if update_partial_result_func:
+    limiter = _get_limiter(translate_func, api_key)
+
+    # Forward streamed lines to the partial-result channel as they arrive
+    # so the UI renders progressively instead of waiting for the batch
+    on_delta = None
+    if STREAM_PARTIAL_RESULTS and update_partial_result_func:
+        stream_parts = []
+
+        async def on_delta(delta: str):
+            stream_parts.append(delta)
+            if '\n' in delta:
+                # Only fan out the complete lines; the trailing partial
+                # line stays buffered so consumers never see a segment
+                # that's still mid-generation
+                text = "".join(stream_parts)
+                complete = text[:text.rfind('\n') + 1]
+                if complete:
                     await update_partial_result_func(
                         message_id=message_id,
                         batch_index=batch_index,
-                        translated_text=translated_text,
+                        translated_text=complete,
                         total_batches=total_batches
                     )
-                
-                return batch_index, translated_text
-                
-            elif result.get("status") == "failed":
-                error_msg = result.get("error", "Unknown translation error")
+
+    # Gate execution behind the shared semaphore: every batch coroutine is
+    # submitted to asyncio.gather up front, and this is what enforces the
+    # in-flight request cap
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)  # standalone call, no shared cap
+    async with semaphore:
+        for retry_count in range(max_retries + 1):
+            # A tripped breaker means the key is bad for every batch -
+            # abort instead of burning this batch's own retry budget
+            if breaker is not None and breaker["tripped"]:
+                raise Exception(f"Circuit breaker open - aborting batch {batch_index+1} without retries")
+            try:
+                if retry_count > 0:
+                    logger.info(f"[{message_id}] Retry {retry_count+1}/{max_retries} for batch {batch_index+1}/{total_batches}")
+
+                # Prepare translation prompt - JSON-encode the segment list so
+                # the model sees a proper array, not a Python repr
+                length = len(batch)
+                prompt = (
+                    f"{SYSTEM_PROMPT}\n"
+                    f"[Translate the text to {target_lang} which is code for a language. "
+                    f"the translations should be in an array of strings with the same length as the source text. "
+                    f"that is {length} translations]\n"
+                    f"{_json_dumps(batch)}"
+                )
+
+                # Call async translation function
+                if on_delta is not None:
+                    stream_parts.clear()  # drop partial output from a failed attempt
+                result = await translate_text_async(
+                    translate_func,
+                    message_id,
+                    model_name,
+                    api_key,
+                    prompt,
+                    executor,
+                    on_delta=on_delta
+                )
+
+                # Extract translated text
+                if result.get("status") == "completed":
+                    translated_text = result["translated_text"].replace('</br>', '\n')
+
+                    # Calculate processing time
+                    processing_time = time.time() - start_time
+                    logger.info(f"[{message_id}] ✅ Batch {batch_index+1}/{total_batches} completed in {processing_time:.2f}s")
+
+                    # Report progress: enqueue for the coalescing flusher
+                    # when available (non-blocking), otherwise await inline
+                    progress = max(10, int(((batch_index + 1) / total_batches) * 85) + 10)  # 10-95% range
+                    status_payload = {
+                        "message_id": message_id,
+                        "progress": progress,
+                        "status_type": "started",
+                        "message": f"Completed batch {batch_index+1}/{total_batches} ({processing_time:.1f}s)"
+                    }
+                    partial_payload = {
+                        "message_id": message_id,
+                        "batch_index": batch_index,
+                        "translated_text": translated_text,
+                        "total_batches": total_batches
+                    }
+                    if status_queue is not None:
+                        status_queue.put_nowait(("status", status_payload))
+                        status_queue.put_nowait(("partial", partial_payload))
+                    else:
+                        if update_status_func:
+                            await update_status_func(**status_payload)
+                        if update_partial_result_func:
+                            await update_partial_result_func(**partial_payload)
+
+                    return batch_index, translated_text
+
+                elif result.get("status") == "failed":
+                    error_msg = result.get("error", "Unknown translation error")
+                    exc = result.get("exception")
+                    if exc is not None and _is_auth_error(exc):
+                        raise exc  # breaker logic in the handler below
+                    if retry_count < max_retries:
+                        logger.warning(f"[{message_id}] Batch {batch_index+1} failed, retrying: {error_msg}")
+                        await limiter.wait_then_retry(result.get("exception"), retry_count)
+                        continue
+                    else:
+                        raise Exception(f"Translation failed after {max_retries} retries: {error_msg}")
+                else:
+                    raise Exception(f"Unexpected result format: {result}")
+
+            except Exception as e:
+                if breaker is not None and _is_auth_error(e):
+                    breaker["failures"] += 1
+                    if breaker["failures"] >= CIRCUIT_BREAKER_THRESHOLD:
+                        breaker["tripped"] = True
+                        logger.error(f"[{message_id}] 🔌 Circuit breaker tripped after {breaker['failures']} auth failures")
+                    raise e
                 if retry_count < max_retries:
-                    logger.warning(f"[{message_id}] Batch {batch_index+1} failed, retrying: {error_msg}")
-                    await asyncio.sleep(2 ** retry_count)  # Exponential backoff
+                    logger.warning(f"[{message_id}] Batch {batch_index+1} error, retrying: {str(e)}")
+                    await limiter.wait_then_retry(e, retry_count)
                     continue
                 else:
-                    raise Exception(f"Translation failed after {max_retries} retries: {error_msg}")
-            else:
-                raise Exception(f"Unexpected result format: {result}")
-                
-        except Exception as e:
-            if retry_count < max_retries:
-                logger.warning(f"[{message_id}] Batch {batch_index+1} error, retrying: {str(e)}")
-                await asyncio.sleep(2 ** retry_count)
+                    logger.error(f"[{message_id}] Batch {batch_index+1} failed permanently: {str(e)}")
+                    raise e
+
+        # This should never be reached due to the retry logic above
+        raise Exception(f"Batch {batch_index+1} failed after all retries")
+
+async def translate_segments_batch_api(
+    segments: List[str],
+    message_id: str,
+    model_name: str,
+    api_key: str,
+    source_lang: Optional[str] = None,
+    target_lang: Optional[str] = None,
+    update_status_func: Optional[Callable] = None,
+    batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Translate segments through OpenAI's Batch API instead of realtime calls.
+
+    For huge documents where seconds of latency don't matter, the Batch API
+    is roughly half the cost of realtime chat completions and has much
+    higher throughput ceilings. All batches are serialized into one JSONL
+    upload, a batch job is created, polled with exponential backoff, and
+    the output file is reassembled by custom_id.
+
+    Args:
+        segments: List of text segments to translate
+        message_id: Unique identifier for the translation job
+        model_name: Model to use for translation (OpenAI models only)
+        api_key: OpenAI API key
+        source_lang: Source language code
+        target_lang: Target language code
+        update_status_func: Function to update translation status
+        batch_size: Number of segments per batch (auto-optimized if None)
+
+    Returns:
+        Dict with translation results
+    """
+    import io
+
+    start_time = time.time()
+    total_chars = sum(map(len, segments))
+
+    if batch_size is None:
+        batch_size, _ = get_optimal_config(total_chars)
+
+    batched_segments = _build_batches(segments, batch_size, model_name)
+    total_batches = len(batched_segments)
+    logger.info(f"[{message_id}] 📦 BATCH API TRANSLATION: {total_batches} batches, {total_chars:,} chars")
+
+    client = _openai_async_client(api_key)
+
+    try:
+        # Serialize every batch as one JSONL request line, keyed by index
+        buf = io.BytesIO()
+        for i, batch in enumerate(batched_segments):
+            length = len(batch)
+            prompt = (
+                f"{SYSTEM_PROMPT}\n"
+                f"[Translate the text to {target_lang} which is code for a language. "
+                f"the translations should be in an array of strings with the same length as the source text. "
+                f"that is {length} translations]\n"
+                f"{_json_dumps(batch)}"
+            )
+            request_line = {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model_name,
+                    "messages": [
+                        {"role": "system", "content": "You are a professional translator. Translate the provided text accurately."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "temperature": 0.3,
+                    "max_tokens": 4000
+                }
+            }
+            buf.write((_json_dumps(request_line) + "\n").encode("utf-8"))
+        buf.seek(0)
+
+        # Upload the JSONL and create the batch job. The filename matters:
+        # the Batch endpoint validates the upload as .jsonl, and an anonymous
+        # BytesIO carries no name for it to check
+        batch_file = await client.files.create(file=("batch.jsonl", buf), purpose="batch")
+        job = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"[{message_id}] Batch job {job.id} created, polling for completion...")
+
+        if update_status_func:
+            await update_status_func(
+                message_id=message_id,
+                progress=10,
+                status_type="started",
+                message=f"Batch API job submitted ({total_batches} batches)"
+            )
+
+        # Poll with exponential backoff until the job resolves
+        delay = BATCH_API_POLL_INITIAL_SECONDS
+        deadline = time.time() + BATCH_API_TIMEOUT_SECONDS
+        while job.status not in ("completed", "failed", "expired", "cancelled"):
+            if time.time() > deadline:
+                raise Exception(f"Batch job {job.id} timed out after {BATCH_API_TIMEOUT_SECONDS:.0f}s (status: {job.status})")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BATCH_API_POLL_MAX_SECONDS)
+            job = await client.batches.retrieve(job.id)
+
+            counts = getattr(job, "request_counts", None)
+            if update_status_func and counts and counts.total:
+                progress = max(10, int((counts.completed / counts.total) * 85) + 10)
+                await update_status_func(
+                    message_id=message_id,
+                    progress=progress,
+                    status_type="started",
+                    message=f"Batch API: {counts.completed}/{counts.total} requests completed"
+                )
+
+        if job.status != "completed":
+            raise Exception(f"Batch job {job.id} ended with status: {job.status}")
+
+        # Download the output file and reassemble results by custom_id
+        output = await client.files.content(job.output_file_id)
+        translated_batches = [None] * total_batches
+        completed = 0
+        failed = 0
+        for line in output.text.splitlines():
+            if not line.strip():
                 continue
+            record = _json_loads(line)
+            idx = int(record["custom_id"])
+            body = (record.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            if choices:
+                content_text = choices[0]["message"]["content"]
+                translated_batches[idx] = _extract_translations(content_text).replace('</br>', '\n')
+                completed += 1
             else:
-                logger.error(f"[{message_id}] Batch {batch_index+1} failed permanently: {str(e)}")
-                raise e
-    
-    # This should never be reached due to the retry logic above
-    raise Exception(f"Batch {batch_index+1} failed after all retries")
+                error = (record.get("error") or {}).get("message", "no choices returned")
+                translated_batches[idx] = f"<failed>Batch {idx+1} translation failed: {error}</failed>"
+                failed += 1
+
+        final_text = "\n".join(
+            text if text is not None else f"<missing>Batch {i+1} missing</missing>"
+            for i, text in enumerate(translated_batches)
+        )
+        total_time = time.time() - start_time
+
+        if update_status_func:
+            await update_status_func(
+                message_id=message_id,
+                progress=100,
+                status_type="completed",
+                message=f"Batch API translation completed: {completed}/{total_batches} batches in {total_time:.1f}s"
+            )
+
+        logger.info(f"[{message_id}] 🎉 BATCH API TRANSLATION COMPLETED in {total_time:.1f}s")
+
+        return {
+            "status": "completed",
+            "message_id": message_id,
+            "translated_text": final_text,
+            "model_used": model_name,
+            "performance": {
+                "total_time": total_time,
+                "batches_completed": completed,
+                "batches_failed": failed,
+                "chars_per_second": total_chars / total_time if total_time > 0 else 0,
+                "batch_api": True
+            }
+        }
+
+    except Exception as e:
+        logger.error(f"[{message_id}] Batch API translation failed: {str(e)}")
+        if update_status_func:
+            await update_status_func(
+                message_id=message_id,
+                progress=0,
+                status_type="failed",
+                message=f"Batch API translation failed: {str(e)}"
+            )
+        return {
+            "status": "failed",
+            "message_id": message_id,
+            "error": str(e),
+            "model_used": model_name
+        }
 
 async def translate_segments_parallel(
     segments: List[str],
@@ -282,11 +935,12 @@ async def translate_segments_parallel(
     update_status_func: Optional[Callable] = None,
     update_partial_result_func: Optional[Callable] = None,
     batch_size: Optional[int] = None,
-    max_workers: Optional[int] = None
+    max_workers: Optional[int] = None,
+    use_batch_api: Optional[bool] = None
 ) -> Dict[str, Any]:
     """
     Translate segments in parallel with optimal performance.
-    
+
     Args:
         segments: List of text segments to translate
         translate_func: Translation function to use
@@ -299,7 +953,9 @@ async def translate_segments_parallel(
         update_partial_result_func: Function to update partial results
         batch_size: Number of segments per batch (auto-optimized if None)
         max_workers: Maximum parallel workers (auto-optimized if None)
-        
+        use_batch_api: Route the job through OpenAI's Batch API (defaults to
+            the USE_BATCH_API env flag for large OpenAI jobs)
+
     Returns:
         Dict with translation results
     """
@@ -312,8 +968,29 @@ async def translate_segments_parallel(
         }
     
     start_time = time.time()
-    total_chars = sum(len(segment) for segment in segments)
-    
+    total_chars = sum(map(len, segments))  # map(len, ...) keeps the reduction in C
+
+    # Huge offline jobs can trade latency for the Batch API's ~50% lower
+    # cost and higher throughput ceiling. Opt in explicitly or via env flag;
+    # only OpenAI models have this endpoint.
+    if use_batch_api is None:
+        use_batch_api = (
+            USE_BATCH_API
+            and total_chars > RECOMMENDED_CONTENT_LENGTH
+            and getattr(translate_func, '__name__', None) == 'translate_with_openai'
+        )
+    if use_batch_api:
+        return await translate_segments_batch_api(
+            segments=segments,
+            message_id=message_id,
+            model_name=model_name,
+            api_key=api_key,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            update_status_func=update_status_func,
+            batch_size=batch_size
+        )
+
     # Auto-optimize batch size and worker count
     if batch_size is None or max_workers is None:
         opt_batch_size, opt_max_workers = get_optimal_config(total_chars)
@@ -323,34 +1000,88 @@ async def translate_segments_parallel(
     logger.info(f"[{message_id}] 🚀 PARALLEL TRANSLATION STARTED")
     logger.info(f"[{message_id}] Content: {len(segments)} segments, {total_chars:,} chars")
     logger.info(f"[{message_id}] Config: {batch_size} segments/batch, {max_workers} parallel workers")
-    
+
+    # Resolve repeated segments from the translation cache first so only
+    # unseen text is sent to the model
+    cached_hits: Dict[int, str] = {}
+    miss_segments: List[str] = []
+    miss_keys: List[bytes] = []
+    for idx, segment in enumerate(segments):
+        key = _cache_key(model_name, target_lang, segment)
+        hit = _cache_get(key)
+        if hit is not None:
+            cached_hits[idx] = hit
+        else:
+            miss_segments.append(segment)
+            miss_keys.append(key)
+
+    if cached_hits:
+        logger.info(f"[{message_id}] Cache: {len(cached_hits)}/{len(segments)} segments resolved without an API call")
+
+    # Within-job dedup: a single document often repeats strings (stanza
+    # refrains, empty lines, names). Translate each distinct segment once
+    # and scatter the result back by index - pure token/latency savings.
+    seen: Dict[str, int] = {}
+    miss_mapping: List[int] = []  # miss position -> index into unique set
+    unique_keys: List[bytes] = []
+    for seg, seg_key in zip(miss_segments, miss_keys):
+        unique_idx = seen.setdefault(seg, len(unique_keys))
+        if unique_idx == len(unique_keys):
+            unique_keys.append(seg_key)
+        miss_mapping.append(unique_idx)
+    unique_segments = list(seen.keys())
+
+    if len(unique_segments) < len(miss_segments):
+        logger.info(f"[{message_id}] Dedup: {len(miss_segments) - len(unique_segments)} duplicate segments translated once")
+
+    if not miss_segments:
+        # Every segment was cached - skip the API entirely
+        total_time = time.time() - start_time
+        final_text = "\n".join(cached_hits[i] for i in range(len(segments)))
+        if update_status_func:
+            await update_status_func(
+                message_id=message_id,
+                progress=100,
+                status_type="completed",
+                message="Translation served entirely from cache"
+            )
+        return {
+            "status": "completed",
+            "message_id": message_id,
+            "translated_text": final_text,
+            "model_used": model_name,
+            "performance": {
+                "total_time": total_time,
+                "batches_completed": 0,
+                "batches_failed": 0,
+                "chars_per_second": total_chars / total_time if total_time > 0 else 0,
+                "parallel_workers": max_workers
+            }
+        }
+
     # Create batches
-    batched_segments = []
-    current_batch = []
-    current_length = 0
-    
-    for segment in segments:
-        segment_length = len(segment)
-        
-        # If adding this segment exceeds character limit, start new batch
-        if current_length + segment_length > MAX_BATCH_CHARS and current_batch:
-            batched_segments.append("\n".join(current_batch))
-            current_batch = []
-            current_length = 0
-        
-        current_batch.append(segment)
-        current_length += segment_length
-        
-        # If batch reaches size limit, start new batch
-        if len(current_batch) >= batch_size:
-            batched_segments.append("\n".join(current_batch))
-            current_batch = []
-            current_length = 0
-    
-    # Add final batch if not empty
-    if current_batch:
-        batched_segments.append("\n".join(current_batch))
-    
+    batched_segments = _build_batches(unique_segments, batch_size, model_name)
+
+    # Batch-then-shard: when a job yields only a handful of batches while
+    # workers sit idle, one token-heavy batch dominates wall time. Halve
+    # the heaviest batch (in place, preserving segment order) until the
+    # work spreads across the workers or shards hit the size floor.
+    if len(batched_segments) < max_workers // 2:
+        original_count = len(batched_segments)
+        while len(batched_segments) < max_workers:
+            idx = max(
+                range(len(batched_segments)),
+                key=lambda i: sum(_count_tokens(s, model_name) for s in batched_segments[i])
+            )
+            heavy = batched_segments[idx]
+            heavy_tokens = sum(_count_tokens(s, model_name) for s in heavy)
+            if len(heavy) <= SHARD_MIN_SEGMENTS or heavy_tokens <= MAX_BATCH_TOKENS // 2:
+                break
+            mid = len(heavy) // 2
+            batched_segments[idx:idx + 1] = [heavy[:mid], heavy[mid:]]
+        if len(batched_segments) > original_count:
+            logger.info(f"[{message_id}] Sharded {original_count} heavy batches into {len(batched_segments)} for better parallelism")
+
     total_batches = len(batched_segments)
     logger.info(f"[{message_id}] Created {total_batches} batches for parallel processing")
     
@@ -363,102 +1094,169 @@ async def translate_segments_parallel(
             message=f"Starting parallel translation of {total_batches} batches"
         )
     
-    # Create ThreadPoolExecutor for parallel AI API calls
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Create translation tasks
-        tasks = []
-        for i, batch in enumerate(batched_segments):
-            task = translate_batch_parallel(
-                batch_index=i,
-                batch=batch,
-                translate_func=translate_func,
+    # Concurrency is a count of in-flight async requests, not OS threads -
+    # the native async clients multiplex on one event loop, so the cap can
+    # track provider RPM limits instead of thread-pool size. All batch
+    # coroutines are submitted at once; the semaphore gates execution.
+    effective_workers = max(1, min(max_workers, total_batches))
+    semaphore = asyncio.Semaphore(effective_workers)
+
+    # Coalesce progress traffic: batch completions enqueue updates and one
+    # flusher coroutine drains them every PROGRESS_FLUSH_INTERVAL, so the
+    # status backend sees one write per window instead of two per batch
+    status_queue = None
+    flusher_task = None
+    if update_status_func or update_partial_result_func:
+        status_queue = asyncio.Queue()
+        flusher_task = asyncio.create_task(
+            _progress_flusher(status_queue, update_status_func, update_partial_result_func)
+        )
+
+    # Shared circuit breaker: an invalid key fails every batch the same
+    # way, so after a few auth failures the remaining batches abort
+    # immediately instead of each burning its full retry/backoff cycle
+    breaker = {"failures": 0, "tripped": False}
+
+    # Create translation tasks
+    tasks = []
+    for i, batch in enumerate(batched_segments):
+        task = translate_batch_parallel(
+            batch_index=i,
+            batch=batch,
+            translate_func=translate_func,
+            message_id=message_id,
+            model_name=model_name,
+            api_key=api_key,
+            source_lang=source_lang,
+            target_lang=target_lang,
+            update_status_func=update_status_func,
+            total_batches=total_batches,
+            semaphore=semaphore,
+            update_partial_result_func=update_partial_result_func,
+            status_queue=status_queue,
+            breaker=breaker
+        )
+        tasks.append(task)
+        
+    logger.info(f"[{message_id}] Executing {len(tasks)} parallel translation tasks...")
+    
+    # Execute all batches in parallel
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Stop the flusher and flush whatever is still queued before the
+        # final status write, so a stale progress value can't land last
+        if flusher_task is not None:
+            flusher_task.cancel()
+            try:
+                await flusher_task
+            except asyncio.CancelledError:
+                pass
+
+        # Process results directly into the final ordered list -
+        # asyncio.gather returns results in submission order, so no
+        # intermediate dict or second reassembly pass is needed
+        final_translation = [None] * total_batches
+        completed = 0
+        failed = 0
+
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error(f"[{message_id}] Batch {i+1} failed: {str(result)}")
+                final_translation[i] = f"<failed>Batch {i+1} translation failed: {str(result)}</failed>"
+                failed += 1
+            else:
+                _, translated_text = result
+                final_translation[i] = translated_text
+                completed += 1
+
+        final_text = "\n".join(final_translation)
+
+        # Populate the cache, expand deduplicated segments, and splice
+        # cached hits back into place. All of this requires the model to
+        # have kept the 1:1 source-line-to-output-line alignment it was
+        # prompted for, so check the line count before trusting it.
+        miss_lines = final_text.split('\n')
+        aligned = len(miss_lines) == len(unique_keys)
+        if aligned:
+            if failed == 0:
+                for key, line in zip(unique_keys, miss_lines):
+                    _cache_put(key, line)
+            # Scatter unique translations back over duplicate positions
+            miss_lines = [miss_lines[unique_idx] for unique_idx in miss_mapping]
+            if cached_hits:
+                line_iter = iter(miss_lines)
+                final_text = "\n".join(
+                    cached_hits[i] if i in cached_hits else next(line_iter, "")
+                    for i in range(len(segments))
+                )
+            else:
+                final_text = "\n".join(miss_lines)
+        elif cached_hits or len(unique_keys) < len(miss_segments):
+            # The indices in miss_mapping and cached_hits only make sense
+            # against an aligned line count - expanding or splicing here
+            # would pair segments with the wrong lines (or drop every
+            # duplicate occurrence). Return the raw output with a loud
+            # warning instead of a subtly reordered or shortened result.
+            logger.warning(
+                f"[{message_id}] Model output has {len(miss_lines)} lines for "
+                f"{len(unique_keys)} unique segments - returning it without "
+                f"dedup expansion or cache splicing"
+            )
+
+        total_time = time.time() - start_time
+        
+        # Final status update
+        if update_status_func:
+            await update_status_func(
                 message_id=message_id,
-                model_name=model_name,
-                api_key=api_key,
-                source_lang=source_lang,
-                target_lang=target_lang,
-                update_status_func=update_status_func,
-                total_batches=total_batches,
-                executor=executor,
-                update_partial_result_func=update_partial_result_func
+                progress=100,
+                status_type="completed",
+                message=f"Parallel translation completed: {completed}/{total_batches} batches in {total_time:.1f}s"
             )
-            tasks.append(task)
         
-        logger.info(f"[{message_id}] Executing {len(tasks)} parallel translation tasks...")
+        logger.info(f"[{message_id}] 🎉 PARALLEL TRANSLATION COMPLETED")
+        logger.info(f"[{message_id}] Results: {completed} success, {failed} failed in {total_time:.2f}s")
+        logger.info(f"[{message_id}] Speed: ~{total_chars/total_time:.0f} chars/second")
         
-        # Execute all batches in parallel
-        try:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Process results
-            translated_batches = {}
-            completed = 0
-            failed = 0
-            
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"[{message_id}] Batch {i+1} failed: {str(result)}")
-                    translated_batches[i] = f"<failed>Batch {i+1} translation failed: {str(result)}</failed>"
-                    failed += 1
-                else:
-                    batch_index, translated_text = result
-                    translated_batches[batch_index] = translated_text
-                    completed += 1
-            
-            # Assemble final result in correct order
-            final_translation = []
-            for i in range(total_batches):
-                if i in translated_batches:
-                    final_translation.append(translated_batches[i])
-                else:
-                    final_translation.append(f"<missing>Batch {i+1} missing</missing>")
-            
-            final_text = "\n".join(final_translation)
-            total_time = time.time() - start_time
-            
-            # Final status update
-            if update_status_func:
-                await update_status_func(
-                    message_id=message_id,
-                    progress=100,
-                    status_type="completed",
-                    message=f"Parallel translation completed: {completed}/{total_batches} batches in {total_time:.1f}s"
-                )
-            
-            logger.info(f"[{message_id}] 🎉 PARALLEL TRANSLATION COMPLETED")
-            logger.info(f"[{message_id}] Results: {completed} success, {failed} failed in {total_time:.2f}s")
-            logger.info(f"[{message_id}] Speed: ~{total_chars/total_time:.0f} chars/second")
-            
-            return {
-                "status": "completed",
-                "message_id": message_id,
-                "translated_text": final_text,
-                "model_used": model_name,
-                "performance": {
-                    "total_time": total_time,
-                    "batches_completed": completed,
-                    "batches_failed": failed,
-                    "chars_per_second": total_chars / total_time if total_time > 0 else 0,
-                    "parallel_workers": max_workers
-                }
-            }
-            
-        except Exception as e:
-            logger.error(f"[{message_id}] Parallel translation failed: {str(e)}")
-            if update_status_func:
-                await update_status_func(
-                    message_id=message_id,
-                    progress=0,
-                    status_type="failed",
-                    message=f"Parallel translation failed: {str(e)}"
-                )
-            
-            return {
-                "status": "failed",
-                "message_id": message_id,
-                "error": str(e),
-                "model_used": model_name
+        return {
+            "status": "completed",
+            "message_id": message_id,
+            "translated_text": final_text,
+            "model_used": model_name,
+            "performance": {
+                "total_time": total_time,
+                "batches_completed": completed,
+                "batches_failed": failed,
+                "chars_per_second": total_chars / total_time if total_time > 0 else 0,
+                "parallel_workers": max_workers
             }
+        }
+        
+    except Exception as e:
+        logger.error(f"[{message_id}] Parallel translation failed: {str(e)}")
+        if update_status_func:
+            await update_status_func(
+                message_id=message_id,
+                progress=0,
+                status_type="failed",
+                message=f"Parallel translation failed: {str(e)}"
+            )
+        
+        return {
+            "status": "failed",
+            "message_id": message_id,
+            "error": str(e),
+            "model_used": model_name
+        }
+
+    finally:
+        if flusher_task is not None and not flusher_task.done():
+            flusher_task.cancel()
+            try:
+                await flusher_task
+            except asyncio.CancelledError:
+                pass
 
 # Import compatibility functions from original segmentation
 def segment_text(text: str, language: Optional[str] = None, use_segmentation: Optional[str] = "botok") -> List[str]:
@@ -0,0 +1,106 @@
+"""
+Persistent translation cache backed by SQLite
+
+The in-process caches reset on every worker restart, so recurring jobs over
+the same corpus (re-runs, shared scriptural passages) paid full API price
+again. This module keeps a content-addressed key/value store on disk:
+SHA-256 of (model_name, target_lang, segment) -> translated line. SQLite in
+WAL mode handles concurrent readers alongside a writer, which matches the
+worker's access pattern (many lookups, occasional bursts of inserts).
+
+All operations fail soft: a broken or locked database logs a warning and
+behaves like a cache miss rather than failing the translation job.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Where the cache database lives (override per deployment)
+CACHE_DB_PATH = os.getenv("TRANSLATION_CACHE_DB", "translation_cache.db")
+
+# One shared connection per process, guarded by a lock - SQLite serializes
+# writes anyway, and a single WAL connection avoids open/close churn
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Get the shared SQLite connection, creating the schema on first use"""
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        # WAL lets readers proceed while a writer commits; NORMAL sync is
+        # safe with WAL and avoids an fsync per insert
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, "
+            "value TEXT NOT NULL, "
+            "created_at REAL NOT NULL)"
+        )
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def cache_key(model_name: str, target_lang: str, segment: str) -> str:
+    """
+    Build the content-addressed cache key for a segment
+
+    The model and target language are part of the key because the same
+    source segment translates differently per model and per language.
+    """
+    payload = f"{model_name}|{target_lang}|{segment}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Look up a cached translation; None on miss (or on any cache error)"""
+    try:
+        with _lock:
+            row = _get_conn().execute(
+                "SELECT value FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+    except Exception as e:
+        logger.warning("Translation cache read failed: %s", e)
+        return None
+
+
+def put(key: str, value: str) -> None:
+    """Store a translation; errors are logged and swallowed"""
+    put_many([(key, value)])
+
+
+def put_many(items) -> None:
+    """
+    Store many translations in a single transaction
+
+    One commit (and one fsync) for the whole job instead of one per
+    segment - populating the cache after a multi-thousand-segment job
+    would otherwise issue thousands of serial commits.
+
+    Args:
+        items: Iterable of (key, value) pairs
+    """
+    now = time.time()
+    rows = [(key, value, now) for key, value in items]
+    if not rows:
+        return
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, value, created_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+    except Exception as e:
+        logger.warning("Translation cache write failed: %s", e)
@@ -3,8 +3,152 @@ Translation utilities for different AI models
 Enhanced with parallel processing support while maintaining segment order
 """
 import asyncio
-import concurrent.futures
-from typing import Dict, Any
+import ast
+import functools
+import json
+import logging
+import os
+import random
+import re
+import weakref
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Precompiled pattern for the Claude fallback parser: finds a bracketed
+# list in the raw response. Non-greedy with DOTALL so multi-line JSON
+# arrays match on the first attempt instead of falling through to the
+# line-split heuristic.
+_LIST_RE = re.compile(r'\[(.+?)\]', re.DOTALL)
+
+# Segments with no translatable content: empty/whitespace-only lines and
+# lines of pure digits/punctuation (Unicode-aware, so Tibetan shad/tsheg
+# runs match but actual Tibetan text does not)
+_TRIVIAL_SEGMENT_RE = re.compile(r'^[\s\d\W]*$')
+
+# json-repair fixes malformed-but-close JSON (truncated arrays, stray
+# prose, single quotes) in one pass, replacing most of the heuristic
+# fallback ladder in translate_with_claude. Optional dependency - without
+# it the ladder still runs.
+try:
+    import json_repair
+except ImportError:
+    json_repair = None
+
+# Structured-output plumbing for the Claude and Gemini paths. Defining the
+# Pydantic model per call forced a full model rebuild each invocation, and
+# with_structured_output re-derives the JSON schema and binds a new tool on
+# every call - cache both per (model, key) so hundreds of batches pay once.
+# Imports stay lazy, matching the rest of this module.
+@functools.lru_cache(maxsize=1)
+def _translation_schema():
+    """Get the shared Translation schema class (built once)"""
+    from pydantic import BaseModel, Field
+
+    class Translation(BaseModel):
+        translation: List[str] = Field(description="List of translations of the sourcetext")
+
+    return Translation
+
+
+# Async clients hold connections bound to the event loop they were created
+# on, and the Celery workers run a fresh loop per job - a process-global
+# cache would hand job N+1 a pool of connections from job N's closed loop
+# and every request would die with "RuntimeError: Event loop is closed".
+# Cache per running loop instead; the WeakKeyDictionary lets a finished
+# loop's clients be garbage-collected along with the loop.
+_LOOP_CLIENTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _loop_client(key, factory):
+    """Get a client cached for the current event loop, building it once"""
+    loop = asyncio.get_running_loop()
+    cache = _LOOP_CLIENTS.setdefault(loop, {})
+    if key not in cache:
+        cache[key] = factory()
+    return cache[key]
+
+
+def _shared_http_client():
+    """
+    Get the pooled httpx.AsyncClient shared within the current event loop
+
+    Each SDK otherwise builds its own small connection pool, so concurrent
+    batches renegotiate TLS against the same host. One client with a large
+    keepalive pool (HTTP/2 multiplexing when the h2 extra is installed)
+    lets every in-flight request reuse warm connections.
+    """
+    def build():
+        import httpx
+        # Size the pool to the dispatcher's in-flight ceiling: a pool
+        # smaller than MAX_INFLIGHT_REQUESTS would let acquired semaphore
+        # slots queue inside httpx and die with PoolTimeout under the
+        # overall timeout instead of waiting on the semaphore
+        from utils.text_segmentation_parallel import MAX_INFLIGHT_REQUESTS
+        max_connections = max(100, MAX_INFLIGHT_REQUESTS)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max(50, max_connections // 2)
+        )
+        try:
+            return httpx.AsyncClient(http2=True, limits=limits, timeout=60)
+        except ImportError:
+            # http2 requires the optional h2 package; HTTP/1.1 keepalive
+            # pooling is still shared
+            return httpx.AsyncClient(limits=limits, timeout=60)
+
+    return _loop_client("httpx", build)
+
+
+def _openai_async_client(api_key):
+    """Get the AsyncOpenAI client cached for this event loop and API key"""
+    def build():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key, http_client=_shared_http_client())
+
+    return _loop_client(("openai", api_key), build)
+
+
+@functools.lru_cache(maxsize=16)
+def _claude_structured(model_name, api_key):
+    """Get the cached (llm, structured runnable) pair for a Claude model"""
+    from langchain_anthropic import ChatAnthropic
+    llm = ChatAnthropic(model=model_name, temperature=0, api_key=api_key)
+    return llm, llm.with_structured_output(_translation_schema())
+
+
+@functools.lru_cache(maxsize=16)
+def _gemini_structured(model_name, api_key):
+    """Get the cached (llm, structured runnable) pair for a Gemini model"""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    llm = ChatGoogleGenerativeAI(model=model_name, temperature=0, google_api_key=api_key)
+    return llm, llm.with_structured_output(_translation_schema())
+
+
+def _prompt_messages(content, cacheable=False):
+    """
+    Split a prompt into (system, human) chat messages for provider-side
+    prompt caching
+
+    Provider caches key on a byte-stable prefix, so the shared SYSTEM_PROMPT
+    must arrive as an unchanging system message with the per-batch
+    instructions and segments after it. When cacheable is True the system
+    text is sent as an Anthropic content block tagged cache_control:
+    ephemeral so Claude caches it explicitly; Gemini and OpenAI cache
+    stable prefixes automatically.
+
+    Returns a langchain message list, or the raw string when the content
+    does not carry the SYSTEM_PROMPT prefix.
+    """
+    from const import SYSTEM_PROMPT
+    if not content.startswith(SYSTEM_PROMPT):
+        return content
+    user_part = content[len(SYSTEM_PROMPT):]
+    if cacheable:
+        system_content = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    else:
+        system_content = SYSTEM_PROMPT
+    return [("system", system_content), ("human", user_part)]
 
 
 def translate_with_openai(content, model_name, api_key):
@@ -30,7 +174,7 @@ def translate_with_openai(content, model_name, api_key):
         return {"translated_text": translated_text}
         
     except Exception as e:
-        print(f"OpenAI translation error: {e}")
+        logger.error("OpenAI translation error: %s", e)
         return {"translated_text": f"[OpenAI translation error: {str(e)}]"}
 
 
@@ -38,27 +182,22 @@ def translate_with_claude(content, model_name, api_key):
     """
     Translate text using Anthropic's Claude AI (with robust error handling)
     """
-    from langchain_anthropic import ChatAnthropic
-    from typing import List
-    from pydantic import BaseModel, Field
-    import json
-    import ast
-    
-    llm = ChatAnthropic(model=model_name, temperature=0, api_key=api_key)
-    
-    class Translation(BaseModel):
-        translation: List[str] = Field(description="List of translations of the sourcetext")
+    llm, structured_llm = _claude_structured(model_name, api_key)
+    Translation = _translation_schema()
 
     def translate_text(data):
+        # Route the shared system prompt into a cache_control-tagged system
+        # message so Anthropic serves it from the prompt cache
+        messages = _prompt_messages(data, cacheable=True)
         try:
             # Try structured output first
-            output = llm.with_structured_output(Translation).invoke(data)
+            output = structured_llm.invoke(messages)
             if output and hasattr(output, 'translation') and output.translation:
                 return output
             else:
                 # If structured output fails or returns empty, fall back to regular output
-                print(f"Structured output failed or empty, trying fallback for Claude")
-                regular_output = llm.invoke(data)
+                logger.warning("Structured output failed or empty, trying fallback for Claude")
+                regular_output = llm.invoke(messages)
                 
                 # Try to parse the content as various formats
                 try:
@@ -67,8 +206,21 @@ def translate_with_claude(content, model_name, api_key):
                     else:
                         content_text = str(regular_output)
                     
-                    print(f"Claude raw response: {content_text}")
-                    
+                    logger.debug("Claude raw response (%d chars): %.200s", len(content_text), content_text)
+
+                    # Single repair pass first: json-repair tolerates the
+                    # truncation and quoting damage the heuristics below
+                    # each handle piecemeal
+                    if json_repair is not None:
+                        try:
+                            repaired = json_repair.loads(content_text)
+                            if isinstance(repaired, dict) and isinstance(repaired.get('translation'), list):
+                                return Translation(translation=[str(item) for item in repaired['translation']])
+                            if isinstance(repaired, list) and repaired:
+                                return Translation(translation=[str(item) for item in repaired])
+                        except Exception as repair_error:
+                            logger.debug("json-repair pass failed: %s", repair_error)
+
                     # Method 1: Try to extract JSON from the response
                     if '{' in content_text and '}' in content_text:
                         json_start = content_text.find('{')
@@ -79,7 +231,7 @@ def translate_with_claude(content, model_name, api_key):
                             if 'translation' in parsed_json:
                                 return Translation(translation=parsed_json['translation'])
                         except json.JSONDecodeError:
-                            print("Failed to parse as JSON")
+                            logger.debug("Failed to parse as JSON")
                     
                     # Method 2: Try to parse as Python list literal (e.g., "['item1', 'item2']")
                     if content_text.strip().startswith('[') and content_text.strip().endswith(']'):
@@ -88,12 +240,10 @@ def translate_with_claude(content, model_name, api_key):
                             if isinstance(parsed_list, list):
                                 return Translation(translation=parsed_list)
                         except (ValueError, SyntaxError) as e:
-                            print(f"Failed to parse as Python list literal: {e}")
+                            logger.debug("Failed to parse as Python list literal: %s", e)
                     
                     # Method 3: Look for list-like pattern in text
-                    import re
-                    list_pattern = r'\[([^\]]+)\]'
-                    list_matches = re.findall(list_pattern, content_text)
+                    list_matches = _LIST_RE.findall(content_text)
                     if list_matches:
                         try:
                             # Try to parse the content inside brackets
@@ -105,7 +255,7 @@ def translate_with_claude(content, model_name, api_key):
                                 if items:
                                     return Translation(translation=items)
                         except Exception as e:
-                            print(f"Failed to parse list pattern: {e}")
+                            logger.debug("Failed to parse list pattern: %s", e)
                     
                     # Method 4: If no JSON or list, treat the whole response as lines
                     lines = content_text.strip().split('\n')
@@ -118,16 +268,16 @@ def translate_with_claude(content, model_name, api_key):
                         return Translation(translation=[content_text.strip()])
                     
                 except Exception as parse_error:
-                    print(f"Failed to parse Claude response: {parse_error}")
+                    logger.warning("Failed to parse Claude response: %s", parse_error)
                     # Last resort: return the raw content as a single translation
                     raw_content = str(regular_output)
                     return Translation(translation=[raw_content])
                     
         except Exception as e:
-            print(f"Claude translation error: {e}")
+            logger.error("Claude translation error: %s", e)
             # Check if it's a Pydantic validation error with string input
             if "Input should be a valid list" in str(e):
-                print("Detected Pydantic list validation error, attempting string parsing...")
+                logger.debug("Detected Pydantic list validation error, attempting string parsing...")
                 try:
                     # Extract the problematic input value from the error
                     error_str = str(e)
@@ -139,7 +289,7 @@ def translate_with_claude(content, model_name, api_key):
                             input_end = error_str.find(']', input_start) + 1
                         input_value = error_str[input_start:input_end].strip('"\'')
                         
-                        print(f"Attempting to parse: {input_value}")
+                        logger.debug("Attempting to parse: %.200s", input_value)
                         
                         # Try to parse this as a Python list
                         if input_value.startswith('[') and input_value.endswith(']'):
@@ -169,7 +319,7 @@ def translate_with_claude(content, model_name, api_key):
             return {"translated_text": "[Translation unavailable - Claude returned empty response]"}
             
     except Exception as e:
-        print(f"Claude function error: {e}")
+        logger.error("Claude function error: %s", e)
         # Return error in the expected format instead of raising
         return {"translated_text": f"[Translation error: {str(e)}]"}
 
@@ -178,30 +328,27 @@ def translate_with_gemini(content, model_name, api_key):
     """
     Translate text using Google's Gemini AI (with input validation)
     """
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from typing import List
-    from pydantic import BaseModel, Field
-    
-    llm = ChatGoogleGenerativeAI(model=model_name, temperature=0, google_api_key=api_key)
-    
-    class Translation(BaseModel):
-        translation: List[str] = Field(description="List of translations of the sourcetext")
+    llm, structured_llm = _gemini_structured(model_name, api_key)
+    Translation = _translation_schema()
 
     def translate_text(data):
+        # Keep the shared system prompt as a stable prefix in its own
+        # system message so Gemini's implicit caching can reuse it
+        messages = _prompt_messages(data)
         try:
-            output = llm.with_structured_output(Translation).invoke(data)
+            output = structured_llm.invoke(messages)
             return output
         except Exception as e:
-            print(f"Gemini translation error: {e}")
+            logger.error("Gemini translation error: %s", e)
             # Fallback for Gemini
             try:
-                regular_output = llm.invoke(data)
+                regular_output = llm.invoke(messages)
                 content_text = regular_output.content if hasattr(regular_output, 'content') else str(regular_output)
                 lines = content_text.strip().split('\n')
                 translations = [line.strip() for line in lines if line.strip()]
                 return Translation(translation=translations)
             except Exception as fallback_error:
-                print(f"Gemini fallback error: {fallback_error}")
+                logger.error("Gemini fallback error: %s", fallback_error)
                 return Translation(translation=["[Translation failed - Gemini error]"])
 
     try:
@@ -211,61 +358,215 @@ def translate_with_gemini(content, model_name, api_key):
         else:
             return {"translated_text": "[Translation unavailable - Gemini returned empty response]"}
     except Exception as e:
-        print(f"Gemini function error: {e}")
+        logger.error("Gemini function error: %s", e)
         return {"translated_text": f"[Translation error: {str(e)}]"}
 
 
+# Retry policy for the async wrappers. Rate-limit spikes and transient
+# 5xx errors used to become "[Batch i failed: ...]" placeholders baked
+# straight into the final document; retrying them with full-jitter
+# exponential backoff turns nearly all of them into successes. Implemented
+# by hand - tenacity would express this declaratively but is not among the
+# project's dependencies.
+_RETRY_MAX_ATTEMPTS = int(os.getenv("TRANSLATE_RETRY_ATTEMPTS", "4"))
+_RETRY_MAX_WAIT_SECONDS = 30
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Check whether a provider error is worth retrying (429/timeouts/5xx)"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status in (408, 429, 500, 502, 503, 529):
+        return True
+    # SDK exception class names cover errors that carry no status code
+    # (timeouts, dropped connections) without importing every SDK here
+    return type(error).__name__ in (
+        "RateLimitError", "APITimeoutError", "APIConnectionError",
+        "InternalServerError", "ServiceUnavailable", "DeadlineExceeded",
+    )
+
+
+async def _retry_transient(operation, provider: str):
+    """
+    Await operation(), retrying transient provider errors
+
+    Waits random.uniform(0, min(2**attempt, 30)) seconds between attempts
+    (full jitter, matching the parallel module's limiter). Non-transient
+    errors and the final attempt's error propagate to the caller.
+    """
+    for attempt in range(_RETRY_MAX_ATTEMPTS):
+        try:
+            return await operation()
+        except Exception as e:
+            if attempt == _RETRY_MAX_ATTEMPTS - 1 or not _is_transient_error(e):
+                raise
+            wait_time = random.uniform(0, min(2 ** attempt, _RETRY_MAX_WAIT_SECONDS))
+            logger.warning("%s transient error (attempt %d/%d), retrying in %.1fs: %s",
+                           provider, attempt + 1, _RETRY_MAX_ATTEMPTS, wait_time, e)
+            await asyncio.sleep(wait_time)
+
+
 # ========================================
-# PARALLEL PROCESSING ASYNC WRAPPERS
+# NATIVE ASYNC TRANSLATION FUNCTIONS
 # ========================================
+# The hot path is pure network I/O - waiting on LLM HTTP responses - so
+# these await the SDKs' native async APIs directly instead of pushing sync
+# calls through a thread pool. One event loop sustains hundreds of
+# concurrent requests with no thread hop or OS-thread cap.
 
-async def translate_with_openai_async(content: str, model_name: str, api_key: str, executor: concurrent.futures.ThreadPoolExecutor) -> Dict[str, Any]:
+async def translate_with_openai_async(content: str, model_name: str, api_key: str) -> Dict[str, Any]:
     """
-    Async wrapper for OpenAI translation using ThreadPoolExecutor for true parallelism
+    Translate using OpenAI's native async client
     """
-    loop = asyncio.get_event_loop()
     try:
-        result = await loop.run_in_executor(executor, translate_with_openai, content, model_name, api_key)
-        return result
+        client = _openai_async_client(api_key)
+        # Keep the shared system prompt as a byte-stable prefix so OpenAI's
+        # automatic prompt caching reuses it across batches
+        from const import SYSTEM_PROMPT
+        if content.startswith(SYSTEM_PROMPT):
+            system_text, user_text = SYSTEM_PROMPT, content[len(SYSTEM_PROMPT):]
+        else:
+            system_text, user_text = "You are a professional translator. Translate the provided text accurately.", content
+        response = await _retry_transient(
+            lambda: client.chat.completions.create(
+                model=model_name,
+                messages=[
+                    {"role": "system", "content": system_text},
+                    {"role": "user", "content": user_text}
+                ],
+                temperature=0.3,
+                max_tokens=4000
+            ),
+            "OpenAI"
+        )
+        # SYSTEM_PROMPT asks for {"translation": [...]} JSON; unwrap it to
+        # newline-joined lines like the Claude and Gemini paths do, so the
+        # caller's per-segment splitting sees lines rather than a JSON blob
+        from utils.text_segmentation_parallel import _extract_translations
+        return {"translated_text": _extract_translations(response.choices[0].message.content)}
     except Exception as e:
-        return {"translated_text": f"[Async OpenAI error: {str(e)}]"}
+        # Surface the failure instead of masking it as translated text -
+        # the ordered pipeline's failure-streak counter needs to see it
+        logger.error("Async OpenAI error: %s", e)
+        return {"status": "failed", "error": str(e), "exception": e}
 
 
-async def translate_with_claude_async(content: str, model_name: str, api_key: str, executor: concurrent.futures.ThreadPoolExecutor) -> Dict[str, Any]:
+async def translate_with_claude_async(content: str, model_name: str, api_key: str) -> Dict[str, Any]:
     """
-    Async wrapper for Claude translation using ThreadPoolExecutor for true parallelism
+    Translate using Claude with a JSON-prefilled constrained response
+
+    Prefilling the assistant turn with '{"translation": [' and stopping on
+    ']}' forces Claude to complete a syntactically valid JSON array - no
+    tool-call wrapper, no extra schema tokens, and the fallback parser
+    cascade becomes a rare path instead of a routine one.
     """
-    loop = asyncio.get_event_loop()
     try:
-        result = await loop.run_in_executor(executor, translate_with_claude, content, model_name, api_key)
-        return result
+        from utils.text_segmentation_parallel import _anthropic_async_client
+        client = _anthropic_async_client(api_key)
+
+        from const import SYSTEM_PROMPT
+        if content.startswith(SYSTEM_PROMPT):
+            system_text, user_text = SYSTEM_PROMPT, content[len(SYSTEM_PROMPT):]
+        else:
+            system_text, user_text = None, content
+
+        prefill = '{"translation": ['
+        request_kwargs = {
+            "model": model_name,
+            "max_tokens": 4000,
+            # Match the temperature=0 the structured-output path used -
+            # Anthropic defaults to 1.0, which would make translations
+            # non-deterministic (and break cache-hit consistency)
+            "temperature": 0,
+            "messages": [
+                {"role": "user", "content": user_text},
+                {"role": "assistant", "content": prefill}
+            ],
+            "stop_sequences": ["]}"]
+        }
+        if system_text is not None:
+            # Cache-control block keeps the shared prompt in Anthropic's
+            # prompt cache, matching the streaming path
+            request_kwargs["system"] = [
+                {"type": "text", "text": system_text, "cache_control": {"type": "ephemeral"}}
+            ]
+
+        response = await _retry_transient(
+            lambda: client.messages.create(**request_kwargs),
+            "Claude"
+        )
+        completed = prefill + response.content[0].text + "]}"
+        try:
+            translations = json.loads(completed).get("translation")
+            if isinstance(translations, list) and translations:
+                return {"translated_text": "\n".join(str(item) for item in translations)}
+        except ValueError:
+            logger.debug("Claude prefill completion was not valid JSON, falling back")
+        # Malformed or empty completion: run the sync fallback parser
+        # ladder in a worker thread rather than duplicating it here
+        return await asyncio.to_thread(translate_with_claude, content, model_name, api_key)
     except Exception as e:
-        return {"translated_text": f"[Async Claude error: {str(e)}]"}
+        logger.error("Async Claude error: %s", e)
+        return {"status": "failed", "error": str(e), "exception": e}
 
 
-async def translate_with_gemini_async(content: str, model_name: str, api_key: str, executor: concurrent.futures.ThreadPoolExecutor) -> Dict[str, Any]:
+async def translate_with_gemini_async(content: str, model_name: str, api_key: str) -> Dict[str, Any]:
     """
-    Async wrapper for Gemini translation using ThreadPoolExecutor for true parallelism
+    Translate using Gemini via the cached structured runnable's ainvoke
     """
-    loop = asyncio.get_event_loop()
     try:
-        result = await loop.run_in_executor(executor, translate_with_gemini, content, model_name, api_key)
-        return result
+        llm, structured_llm = _gemini_structured(model_name, api_key)
+        output = await _retry_transient(
+            lambda: structured_llm.ainvoke(_prompt_messages(content)),
+            "Gemini"
+        )
+        if output and hasattr(output, 'translation') and output.translation:
+            return {"translated_text": "\n".join(output.translation)}
+        return await asyncio.to_thread(translate_with_gemini, content, model_name, api_key)
     except Exception as e:
-        return {"translated_text": f"[Async Gemini error: {str(e)}]"}
+        logger.error("Async Gemini error: %s", e)
+        return {"status": "failed", "error": str(e), "exception": e}
+
+
+# Per-provider in-flight request ceilings, overridable per deployment.
+# Providers tolerate very different concurrency before rate-limiting, so a
+# single compile-time worker count either starves OpenAI or hammers Claude.
+_PROVIDER_LIMITS = {
+    "gpt": int(os.getenv("OPENAI_MAX_CONCURRENCY", "50")),
+    "text-davinci": int(os.getenv("OPENAI_MAX_CONCURRENCY", "50")),
+    "claude": int(os.getenv("CLAUDE_MAX_CONCURRENCY", "20")),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "30")),
+}
+
+
+def _provider_limit(model_name: str, default: int = 15) -> int:
+    """Get the in-flight request ceiling for a model's provider"""
+    for prefix, limit in _PROVIDER_LIMITS.items():
+        if model_name.startswith(prefix):
+            return limit
+    return default
+
+
+# Dispatch table keyed on the first prefix token of the model name
+# ("gpt-4o" -> "gpt", "gemini-1.5-pro" -> "gemini", "text-davinci-003" ->
+# "text") - one dict lookup instead of a chain of startswith tests
+_ASYNC_DISPATCH = {
+    "gpt": translate_with_openai_async,
+    "text": translate_with_openai_async,
+    "claude": translate_with_claude_async,
+    "gemini": translate_with_gemini_async,
+}
 
 
 def get_async_translation_function(model_name: str):
     """
     Get the appropriate async translation function based on model name
     """
-    if model_name.startswith("gpt") or model_name.startswith("text-davinci"):
-        return translate_with_openai_async
-    elif model_name.startswith("claude"):
-        return translate_with_claude_async
-    elif model_name.startswith("gemini"):
-        return translate_with_gemini_async
-    else:
+    prefix = model_name.split("-", 1)[0].split(".", 1)[0]
+    try:
+        return _ASYNC_DISPATCH[prefix]
+    except KeyError:
         raise ValueError(f"Unsupported model: {model_name}")
 
 
@@ -275,39 +576,64 @@ def get_async_translation_function(model_name: str):
 
 async def translate_batch_parallel_ordered(
     batch_index: int,
-    batch_content: str,
+    batch_segments: List[str],
     model_name: str,
     api_key: str,
     source_lang: str,
     target_lang: str,
-    executor: concurrent.futures.ThreadPoolExecutor
+    semaphore: Optional[asyncio.Semaphore] = None,
+    translate_func=None
 ) -> tuple[int, Dict[str, Any]]:
     """
     Translate a single batch in parallel while preserving order through batch_index
-    
+
+    Concurrency is gated by the shared semaphore: all batches are scheduled
+    up front, but only max_workers of them hold an in-flight API request at
+    any moment.
+
     Returns:
         tuple[batch_index, result] - batch_index ensures correct ordering
     """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
     try:
-        # Get the appropriate async translation function
-        translate_func = get_async_translation_function(model_name)
-        
-        # Prepare the prompt for this batch
-        source_lines = batch_content.split('\n')
-        length = len(source_lines)
-        
+        # Resolve the async translation function unless the caller already
+        # did so once for the whole job
+        if translate_func is None:
+            translate_func = get_async_translation_function(model_name)
+
+        # Prepare the prompt for this batch - segments arrive as a list, so
+        # no join/split round-trip is needed. Numbered lines instead of the
+        # old Python list repr: the repr broke on segments containing quotes
+        # or backslashes and spent tokens on bracket/comma punctuation.
+        length = len(batch_segments)
+        numbered_lines = "\n".join(f"{i + 1}. {segment}" for i, segment in enumerate(batch_segments))
+
         from const import SYSTEM_PROMPT
         prompt = (
             f"{SYSTEM_PROMPT}\n"
-            f"[Translate the text to {target_lang} which is code for a language. "
+            f"[Translate the numbered lines below to {target_lang} which is code for a language. "
             f"the translations should be in an array of strings with the same length as the source text. "
-            f"that is {length} translations]\n"
-            f"{source_lines}"
+            f"that is {length} translations, in the same order, without the line numbers]\n"
+            f"{numbered_lines}"
         )
         
-        # Execute translation in parallel
-        result = await translate_func(prompt, model_name, api_key, executor)
-        
+        # Execute translation - the semaphore caps in-flight requests
+        async with semaphore:
+            result = await translate_func(prompt, model_name, api_key)
+
+        # Propagate wrapper failures as failed batches so the caller's
+        # failure-streak counter counts them - a dead API key must trip
+        # the fail-fast cancellation, not ship as "completed" error text
+        if isinstance(result, dict) and result.get("status") == "failed":
+            error_text = result.get("error", "unknown error")
+            return batch_index, {
+                "status": "failed",
+                "error": error_text,
+                "batch_index": batch_index,
+                "translated_text": f"[Batch {batch_index + 1} failed: {error_text}]"
+            }
+
         # Return with batch_index to maintain order
         return batch_index, {
             "status": "completed",
@@ -316,7 +642,13 @@ async def translate_batch_parallel_ordered(
         }
         
     except Exception as e:
-        # Return error with batch_index to maintain order
+        # Catch-all: every failure leaves here as an (index, result) tuple.
+        # Only format the traceback when DEBUG logging is on - it's an
+        # expensive allocation on the failure path
+        logger.error("Batch %d failed: %s", batch_index + 1, e)
+        if logger.isEnabledFor(logging.DEBUG):
+            import traceback
+            logger.debug("Batch %d stack trace: %s", batch_index + 1, traceback.format_exc())
         return batch_index, {
             "status": "failed",
             "error": str(e),
@@ -332,8 +664,9 @@ async def translate_segments_parallel_ordered(
     source_lang: str = "bo",
     target_lang: str = "en",
     batch_size: int = 10,
-    max_workers: int = 15,
-    progress_callback=None
+    max_workers: Optional[int] = None,
+    progress_callback=None,
+    mode: str = "realtime"
 ) -> Dict[str, Any]:
     """
     Translate segments in parallel while maintaining exact order
@@ -345,8 +678,10 @@ async def translate_segments_parallel_ordered(
         source_lang: Source language code
         target_lang: Target language code  
         batch_size: Number of segments per batch
-        max_workers: Maximum parallel workers
+        max_workers: Maximum in-flight requests (default: per-provider limit)
         progress_callback: Optional callback for progress updates
+        mode: "realtime" (default) or "batch" to offload the whole job to
+            the provider's batch endpoint for non-interactive jobs
         
     Returns:
         Dict with translated text in original order
@@ -360,150 +695,296 @@ async def translate_segments_parallel_ordered(
     
     import time
     start_time = time.time()
-    
-    # Create batches while maintaining order
-    batches = []
-    current_batch = []
-    
-    for segment in segments:
-        current_batch.append(segment)
-        if len(current_batch) >= batch_size:
-            batches.append("\n".join(current_batch))
-            current_batch = []
-    
-    # Add final batch if not empty
-    if current_batch:
-        batches.append("\n".join(current_batch))
-    
+
+    # Provider-side batch mode: for offline jobs, hand the whole document
+    # to OpenAI's Batch API - roughly half the realtime price with an
+    # hours-scale completion SLA. Anthropic's Message Batches endpoint is
+    # not exposed by the pinned anthropic SDK, so non-OpenAI models fall
+    # back to the realtime path with a warning.
+    if mode == "batch":
+        if model_name.startswith("gpt") or model_name.startswith("text-davinci"):
+            from utils.text_segmentation_parallel import translate_segments_batch_api
+            return await translate_segments_batch_api(
+                segments=segments,
+                message_id="ordered-batch",
+                model_name=model_name,
+                api_key=api_key,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                batch_size=batch_size
+            )
+        logger.warning("Batch mode requested but %s has no batch endpoint wired; using realtime", model_name)
+
+    # Probe the persistent cache before batching - re-runs and shared
+    # passages skip the API entirely for segments translated before
+    from utils import translation_cache
+    cache_keys = [translation_cache.cache_key(model_name, target_lang, seg) for seg in segments]
+    cached = [translation_cache.get(key) for key in cache_keys]
+    miss_indices = [i for i, hit in enumerate(cached) if hit is None]
+    cache_hits = len(segments) - len(miss_indices)
+
+    # Trivial segments - blank lines, pure digits/punctuation - pass
+    # through unchanged instead of burning tokens and a round-trip; they
+    # ride the same splice path as cache hits below
+    trivial_count = 0
+    for i in miss_indices:
+        if _TRIVIAL_SEGMENT_RE.match(segments[i]):
+            cached[i] = segments[i]
+            trivial_count += 1
+    if trivial_count:
+        miss_indices = [i for i in miss_indices if cached[i] is None]
+        logger.info("%d/%d trivial segments passed through without translation", trivial_count, len(segments))
+
+    # Segments already resolved without the LLM (cache hits + pass-throughs)
+    prefilled = cache_hits + trivial_count
+
+    if not miss_indices:
+        # Every segment resolved locally - no API work at all
+        return {
+            "status": "completed",
+            "translated_text": "\n".join(cached),
+            "performance": {
+                "total_time": time.time() - start_time,
+                "parallel_workers": 0,
+                "cache_hits": cache_hits,
+                "trivial_segments": trivial_count
+            }
+        }
+
+    if cache_hits:
+        logger.info("Translation cache: %d/%d segments already cached", cache_hits, len(segments))
+
+    # Only the cache misses go through batching and translation
+    work_segments = [segments[i] for i in miss_indices]
+
+    # Pack batches against a token budget instead of a bare segment count -
+    # ten long segments no longer overflow max_tokens (truncated output,
+    # retries), and ten short ones no longer waste a round-trip each. Reuses
+    # the tiktoken-aware packer from the parallel module, which falls back
+    # to a chars/3 estimate when tiktoken is not installed; batch_size still
+    # caps the segment count per batch. Batches stay as segment lists all
+    # the way to prompt construction - joining here only forced the batch
+    # worker to split the string right back apart.
+    from utils.text_segmentation_parallel import _build_batches
+    batches = _build_batches(work_segments, batch_size, model_name)
+
     total_batches = len(batches)
-    
+
+    # Resolve the concurrency ceiling per provider unless the caller pinned one
+    if max_workers is None:
+        max_workers = _provider_limit(model_name)
+
     # Progress update
     if progress_callback:
         await progress_callback(f"Starting parallel translation of {total_batches} batches with {max_workers} workers")
     
-    # Create ThreadPoolExecutor for true parallelism
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Execute all batches in TRUE PARALLEL with REAL-TIME PROGRESS
-        try:
-            # Create proper asyncio tasks from coroutines
-            async_tasks = []
-            for batch_index, batch_content in enumerate(batches):
-                coroutine = translate_batch_parallel_ordered(
-                    batch_index=batch_index,
-                    batch_content=batch_content,
-                    model_name=model_name,
-                    api_key=api_key,
-                    source_lang=source_lang,
-                    target_lang=target_lang,
-                    executor=executor
-                )
-                # Create proper asyncio task instead of passing coroutine directly
-                task = asyncio.create_task(coroutine)
-                async_tasks.append((batch_index, task))
-            
-            # Process tasks as they complete for real-time updates
-            ordered_results = {}
-            successful_batches = 0
-            failed_batches = 0
+    # Cap concurrency with a semaphore instead of a thread pool - the work
+    # is awaiting HTTP responses, so async tasks gated on a semaphore give
+    # the same parallelism without OS threads. Never larger than the batch
+    # count, so small jobs don't raise the in-flight ceiling for nothing
+    effective_workers = max(1, min(max_workers, total_batches))
+    semaphore = asyncio.Semaphore(effective_workers)
+
+    # Execute all batches in TRUE PARALLEL with REAL-TIME PROGRESS
+    try:
+        # Resolve provider dispatch once per job, not once per batch - this
+        # also surfaces an unsupported model before any task is scheduled
+        translate_func = get_async_translation_function(model_name)
+
+        # Deduplicate identical batches - boilerplate and repeated
+        # citations recur in real corpora, and every duplicate would
+        # otherwise cost a full LLM round-trip
+        first_occurrence = {}
+        duplicate_of = {}
+        for batch_index, batch_segments in enumerate(batches):
+            canonical = first_occurrence.setdefault(tuple(batch_segments), batch_index)
+            if canonical != batch_index:
+                duplicate_of[batch_index] = canonical
+
+        unique_batches = total_batches - len(duplicate_of)
+
+        # Create proper asyncio tasks from coroutines (unique batches only)
+        async_tasks = []
+        for batch_index, batch_segments in enumerate(batches):
+            if batch_index in duplicate_of:
+                continue
+            coroutine = translate_batch_parallel_ordered(
+                batch_index=batch_index,
+                batch_segments=batch_segments,
+                model_name=model_name,
+                api_key=api_key,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                semaphore=semaphore,
+                translate_func=translate_func
+            )
+            # Create proper asyncio task instead of passing coroutine directly
+            task = asyncio.create_task(coroutine)
+            async_tasks.append((batch_index, task))
+        
+        # Process tasks as they complete for real-time updates. Results land
+        # in a pre-sized list indexed by batch position - the order invariant
+        # lives in the data structure, and assembly needs no membership test
+        results_list: List[Optional[Dict[str, Any]]] = [None] * total_batches
+        successful_batches = 0
+        failed_batches = 0
+
+        # Fail fast on outages: after this many consecutive failures the
+        # API is almost certainly down, so stop burning retry time on the
+        # remaining batches and cancel them instead
+        consecutive_failures = 0
+        max_consecutive_failures = 3
+
+        # Progress events coalesce to percentage changes: a network-bound
+        # callback (Redis/Postgres status writes) must not serialize batch
+        # completions, so at most ~100 events fire per job regardless of
+        # batch count - plus a guaranteed final one
+        last_reported_pct = -1
+
+        pending_tasks = list(async_tasks)
+
+        while pending_tasks:
+            # Wait for at least one task to complete
+            # Extract just the tasks (not the batch_index) for asyncio.wait
+            task_objects = [task for _, task in pending_tasks]
             
-            pending_tasks = list(async_tasks)
+            done, pending = await asyncio.wait(
+                task_objects, 
+                return_when=asyncio.FIRST_COMPLETED
+            )
             
-            while pending_tasks:
-                # Wait for at least one task to complete
-                # Extract just the tasks (not the batch_index) for asyncio.wait
-                task_objects = [task for _, task in pending_tasks]
-                
-                done, pending = await asyncio.wait(
-                    task_objects, 
-                    return_when=asyncio.FIRST_COMPLETED
-                )
+            # Process completed tasks
+            for completed_task in done:
+                # Find which batch this was
+                task_batch_index = None
+                for i, (batch_idx, task) in enumerate(pending_tasks):
+                    if task == completed_task:
+                        task_batch_index = batch_idx
+                        pending_tasks.pop(i)
+                        break
                 
-                # Process completed tasks
-                for completed_task in done:
-                    # Find which batch this was
-                    task_batch_index = None
-                    for i, (batch_idx, task) in enumerate(pending_tasks):
-                        if task == completed_task:
-                            task_batch_index = batch_idx
-                            pending_tasks.pop(i)
-                            break
-                    
-                    try:
-                        result = await completed_task
-                        
-                        if isinstance(result, Exception):
-                            print(f"Task exception: {result}")
-                            failed_batches += 1
-                            ordered_results[task_batch_index] = {
-                                "status": "failed",
-                                "translated_text": f"[Batch {task_batch_index + 1} failed]",
-                                "batch_index": task_batch_index
-                            }
-                        else:
-                            batch_index, batch_result = result
-                            ordered_results[batch_index] = batch_result
-                            
-                            if batch_result.get("status") == "completed":
-                                successful_batches += 1
-                            else:
-                                failed_batches += 1
-                        
-                        # REAL-TIME PROGRESS UPDATE as each batch completes
-                        completed_count = successful_batches + failed_batches
-                        progress_percentage = int((completed_count / total_batches) * 85) + 10  # 10-95% range
-                        
-                        if progress_callback:
-                            await progress_callback(f"Completed batch {completed_count}/{total_batches} ({progress_percentage}%)")
-                        
-                    except Exception as e:
-                        print(f"Error processing completed task: {e}")
+                try:
+                    # translate_batch_parallel_ordered has a catch-all and
+                    # always returns an (index, result) tuple, so no
+                    # exception-instance check is needed here
+                    batch_index, batch_result = await completed_task
+                    results_list[batch_index] = batch_result
+
+                    if batch_result.get("status") == "completed":
+                        successful_batches += 1
+                        consecutive_failures = 0
+                    else:
                         failed_batches += 1
-            
-            # Assemble final translation in correct order
-            final_translation_parts = []
-            for i in range(total_batches):
-                if i in ordered_results:
-                    batch_result = ordered_results[i]
-                    translated_text = batch_result.get("translated_text", f"[Missing batch {i + 1}]")
-                    final_translation_parts.append(translated_text)
+                        consecutive_failures += 1
+
+
+                    # REAL-TIME PROGRESS UPDATE as each batch completes
+                    completed_count = successful_batches + failed_batches
+                    progress_percentage = int((completed_count / unique_batches) * 85) + 10  # 10-95% range
+
+                    if progress_callback and (progress_percentage != last_reported_pct
+                                              or completed_count == unique_batches):
+                        last_reported_pct = progress_percentage
+                        await progress_callback(f"Completed batch {completed_count}/{unique_batches} ({progress_percentage}%)")
+
+                except Exception as e:
+                    logger.error("Error processing completed task: %s", e)
+                    failed_batches += 1
+                    consecutive_failures += 1
+
+            # Cancel everything still pending once the failure streak
+            # says the service is down - the batches would only fail
+            # slowly through their own retry/backoff cycles
+            if consecutive_failures >= max_consecutive_failures and pending_tasks:
+                logger.error("%d consecutive batch failures - cancelling %d pending batches", consecutive_failures, len(pending_tasks))
+                for batch_idx, task in pending_tasks:
+                    task.cancel()
+                    failed_batches += 1
+                    results_list[batch_idx] = {
+                        "status": "failed",
+                        "translated_text": f"[Batch {batch_idx + 1} cancelled after repeated failures]",
+                        "batch_index": batch_idx
+                    }
+                pending_tasks = []
+
+        # Propagate results of canonical batches to their duplicates
+        for dup_index, canonical in duplicate_of.items():
+            if results_list[canonical] is not None:
+                results_list[dup_index] = results_list[canonical]
+                if results_list[canonical].get("status") == "completed":
+                    successful_batches += 1
                 else:
-                    final_translation_parts.append(f"[Missing batch {i + 1}]")
-            
-            final_text = "\n".join(final_translation_parts)
-            total_time = time.time() - start_time
-            
-            # Final progress completion
-            if progress_callback:
-                await progress_callback(f"Parallel translation completed: {successful_batches}/{total_batches} batches in {total_time:.1f}s")
-            
-            return {
-                "status": "completed",
-                "translated_text": final_text,
-                "performance": {
-                    "total_time": total_time,
-                    "batches_completed": successful_batches,
-                    "batches_failed": failed_batches,
-                    "parallel_workers": max_workers,
-                    "batches_per_second": total_batches / total_time if total_time > 0 else 0
-                }
+                    failed_batches += 1
+
+        # Assemble final translation in index order - one generator pass,
+        # one output allocation
+        final_text = "\n".join(
+            result.get("translated_text", f"[Missing batch {i + 1}]") if result is not None
+            else f"[Missing batch {i + 1}]"
+            for i, result in enumerate(results_list)
+        )
+
+        # Populate the persistent cache and splice cached segments back in
+        # by original index. Writes are gated on exact line alignment so a
+        # malformed batch response never poisons the cache.
+        miss_lines = final_text.split("\n")
+        aligned = failed_batches == 0 and len(miss_lines) == len(work_segments)
+        if aligned:
+            # One bulk transaction, run off the event loop - per-segment
+            # puts would block the loop on thousands of serial commits
+            await asyncio.to_thread(
+                translation_cache.put_many,
+                [(cache_keys[seg_index], line) for seg_index, line in zip(miss_indices, miss_lines)]
+            )
+        if prefilled:
+            if aligned:
+                line_iter = iter(miss_lines)
+                final_text = "\n".join(
+                    hit if hit is not None else next(line_iter, "") for hit in cached
+                )
+            else:
+                # Splicing against misaligned output would pair cached and
+                # trivial segments with the wrong miss lines and silently
+                # scramble the order - return the raw miss output instead
+                logger.warning(
+                    "Miss output has %d lines for %d segments - returning it unspliced instead of merging %d prefilled segments",
+                    len(miss_lines), len(work_segments), prefilled
+                )
+
+        total_time = time.time() - start_time
+        
+        # Final progress completion
+        if progress_callback:
+            await progress_callback(f"Parallel translation completed: {successful_batches}/{total_batches} batches in {total_time:.1f}s")
+        
+        return {
+            "status": "completed",
+            "translated_text": final_text,
+            "performance": {
+                "total_time": total_time,
+                "batches_completed": successful_batches,
+                "batches_failed": failed_batches,
+                "parallel_workers": max_workers,
+                "batches_per_second": total_batches / total_time if total_time > 0 else 0
             }
-            
-        except Exception as e:
-            total_time = time.time() - start_time
-            error_msg = f"Parallel translation failed: {str(e)}"
-            
-            if progress_callback:
-                await progress_callback(error_msg)
-            
-            return {
-                "status": "failed",
-                "error": error_msg,
-                "performance": {
-                    "total_time": total_time,
-                    "parallel_workers": max_workers
-                }
+        }
+        
+    except Exception as e:
+        total_time = time.time() - start_time
+        error_msg = f"Parallel translation failed: {str(e)}"
+        
+        if progress_callback:
+            await progress_callback(error_msg)
+        
+        return {
+            "status": "failed",
+            "error": error_msg,
+            "performance": {
+                "total_time": total_time,
+                "parallel_workers": max_workers
             }
+        }
+
+ 
     
-     
-        
-   
+